@@ -733,10 +733,16 @@ async function loadFile(path, name, clickEvent) {
     fileName.textContent = name;
 
     try {
-        const response = await fetch(`/api/file?path=${encodeURIComponent(path)}`);
-        if (!response.ok) throw new Error('Failed to load file');
+        // Metadata as JSON, content as raw bytes (browser revalidates via ETag, 304 if unchanged)
+        const query = `path=${encodeURIComponent(path)}`;
+        const [metaResponse, rawResponse] = await Promise.all([
+            fetch(`/api/file/meta?${query}`),
+            fetch(`/api/file/raw?${query}`, { cache: 'no-cache' })
+        ]);
+        if (!metaResponse.ok || !rawResponse.ok) throw new Error('Failed to load file');
         
-        const data = await response.json();
+        const data = await metaResponse.json();
+        data.content = decodeFileContent(await rawResponse.arrayBuffer());
         currentFile = { path, name, content: data.content, parameters: data.parameters };
         
         console.log('File loaded with parameters:', data.parameters);
@@ -772,6 +778,17 @@ async function loadFile(path, name, clickEvent) {
     }
 }
 
+// Decode raw file bytes: UTF-8 first, fallback to 'iso-8859-1'. Not identical to the server's old
+// Python decoding: browsers treat 'iso-8859-1' as windows-1252 (bytes 0x80-0x9F become e.g. the euro
+// sign instead of control characters), the UTF-8 decoder drops a leading BOM and CRLF is kept as is.
+function decodeFileContent(buffer) {
+    try {
+        return new TextDecoder('utf-8', { fatal: true }).decode(buffer);
+    } catch (error) {
+        return new TextDecoder('iso-8859-1').decode(buffer);
+    }
+}
+
 // Display code with line numbers
 function displayCode(content) {
     const codeContent = document.getElementById('codeContent');
@@ -824,7 +841,8 @@ function updateFileInfo(data) {
     const lines = data.content.split('\n').length;
     const size = formatFileSize(data.size);
     
-    let info = `${lines} lijnen | ${size} | Laatst gewijzigd: ${new Date(data.modified).toLocaleString('nl-NL')}`;
+    // modified is epoch seconds (float) from the server
+    let info = `${lines} lijnen | ${size} | Laatst gewijzigd: ${new Date(data.modified * 1000).toLocaleString('nl-NL')}`;
     
     if (data.parameters) {
         info += ` | Deur: ${data.parameters.length}×${data.parameters.width}×${data.parameters.thickness}mm`;
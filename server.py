@@ -1,105 +1,211 @@
-from flask import Flask, jsonify, send_from_directory, request, send_file
+from flask import Flask, Response, jsonify, send_from_directory, request, send_file, stream_with_context
 from flask_cors import CORS
+from flask_compress import Compress
+import orjson
+import json
+import io
 import os
 from pathlib import Path
 from datetime import datetime
 import subprocess
 import tempfile
-import uuid
 import shutil
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from stat import S_ISDIR
+import time
+from functools import lru_cache
+from collections import OrderedDict
+from operator import itemgetter
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
+# Compress text responses (HTML/CSS/JS, JSON API, raw CNC programs); videos are left alone
+app.config['COMPRESS_MIMETYPES'] = [
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+]
+# Compressed file responses get a new ETag ("...:br") - re-evaluate If-None-Match for them
+app.config['COMPRESS_STREAMING_ENDPOINT_CONDITIONAL'] = ['static', 'index', 'serve_static', 'get_file_raw']
+Compress(app)
+
+# Smaller/cheaper JSON for the browse/search endpoints: no key sorting, no indentation
+app.json.sort_keys = False
+app.json.compact = True
+
 # Check if FFmpeg is available
 def check_ffmpeg():
     """Check if FFmpeg is installed and accessible"""
     return shutil.which('ffmpeg') is not None
 
+
+@lru_cache(maxsize=1)
+def check_nvenc():
+    """Check (once) if FFmpeg can encode H.264 on an NVIDIA GPU via CUDA/NVENC"""
+    if not check_ffmpeg():
+        return False
+    try:
+        hwaccels = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-hwaccels'],
+            stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=10
+        ).stdout
+        if 'cuda' not in hwaccels.split():
+            return False
+        # Listed does not mean usable (no GPU/driver) - encode a few test frames to be sure
+        probe = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+             '-c:v', 'h264_nvenc', '-f', 'null', '-'],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=30
+        )
+        return probe.returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
 # CNC bestanden directory
 #CNC_ROOT = r'E:\Theuma_pro\cnc'
 #CNC_ROOT = r'C:\E_DRIVE_COPY\CNC'
 #CNC_ROOT = r'Z:\\'
 CNC_ROOT = r'/home/joske/workspace/Joske920.git/E_DRIVE_COPY/'
 
+# CNC_ROOT never changes while running - resolve it once instead of per request
+_CNC_ROOT_RESOLVED = Path(CNC_ROOT).resolve()
+
 # Allowed file extensions for CNC programs
 ALLOWED_EXTENSIONS = {'.nc', '.cnc', '.mpf', '.spf', '.txt'}
 
+# Lowercase suffixes incl. '' (bestanden zonder extensie) for the per-entry check
+_ALLOWED_SUFFIXES = frozenset(ALLOWED_EXTENSIONS | {''})
+
+# Directories search_files never descends into (besides hidden '.' directories)
+SEARCH_SKIP_DIRS = frozenset({'$RECYCLE.BIN', 'System Volume Information', '__pycache__'})
+
+# Search stops after this many hits; top-level folders are walked by SEARCH_WORKERS threads
+SEARCH_MAX_RESULTS = 50
+SEARCH_WORKERS = 8
 
-def is_safe_path(base_path, user_path):
-    """Check if the user path is within the base path (security check)"""
-    base = Path(base_path).resolve()
-    target = (base / user_path).resolve()
-    return target.is_relative_to(base)
+# Browser cache lifetime for static files. 0 = always revalidate (cheap 304 via ETag), so
+# frontend updates are picked up immediately; raise for deployments that rarely change.
+STATIC_MAX_AGE = 0
+
+# Read size for streaming ffmpeg output to the client
+FFMPEG_CHUNK_SIZE = 64 * 1024
+
+# Browse results are cached per (path, directory mtime) for at most this many seconds.
+# The TTL catches changes the directory mtime does not reflect (edited files -> sort order).
+BROWSE_CACHE_TTL = 5
+BROWSE_CACHE_SIZE = 256
+
+
+def is_safe_path(user_path):
+    """Check if the user path is within CNC_ROOT (security check)"""
+    # Absolute paths and '..' components are rejected without touching the filesystem
+    if os.path.isabs(user_path) or '..' in Path(user_path).parts:
+        return False
+    # Symlinks can still point outside the root, so the target itself is resolved
+    target = (_CNC_ROOT_RESOLVED / user_path).resolve()
+    return target.is_relative_to(_CNC_ROOT_RESOLVED)
 
 
 def get_file_info(file_path):
-    """Get file metadata"""
+    """Get file metadata (timestamps as epoch seconds, formatted by the frontend)"""
     stat = os.stat(file_path)
     return {
         'size': stat.st_size,
-        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
+        'modified': stat.st_mtime,
+        'created': stat.st_ctime
     }
 
 
-@app.route('/api/browse')
-def browse_directory():
-    """Browse CNC directory structure"""
-    relative_path = request.args.get('path', '')
+def dump_json(obj):
+    """Serialize to JSON bytes with orjson, stdlib json for what orjson rejects"""
+    try:
+        return orjson.dumps(obj)
+    except TypeError:
+        # Lone surrogates (non-UTF-8 file names on Linux) - stdlib json escapes them as before
+        return json.dumps(obj, separators=(',', ':')).encode('ascii')
+
+
+def json_response(obj, status=200):
+    """JSON response via orjson (bytes straight into the body) for the hot endpoints"""
+    return Response(dump_json(obj), status=status, mimetype='application/json')
+
+
+# relative_path -> (dir_mtime_ns, expires_at, body); one entry per directory, least recently used first
+_browse_cache = OrderedDict()
+_browse_cache_lock = threading.Lock()
+
+
+def _browse_cached(relative_path, dir_mtime_ns):
+    """Return the serialized /api/browse response body (bytes).
+
+    A cached body is reused while the directory mtime is unchanged and it is at most
+    BROWSE_CACHE_TTL seconds old; otherwise the directory is scanned again and the
+    old body for that path is replaced.
+    """
+    now = time.monotonic()
+    with _browse_cache_lock:
+        cached = _browse_cache.get(relative_path)
+        if cached is not None and cached[0] == dir_mtime_ns and now < cached[1]:
+            _browse_cache.move_to_end(relative_path)
+            return cached[2]
     
-    # Security check
-    if not is_safe_path(CNC_ROOT, relative_path):
-        return jsonify({'error': 'Invalid path'}), 403
+    # Scan outside the lock; the TTL counts from before the scan started
+    body = _scan_browse(relative_path)
     
+    with _browse_cache_lock:
+        _browse_cache[relative_path] = (dir_mtime_ns, now + BROWSE_CACHE_TTL, body)
+        _browse_cache.move_to_end(relative_path)
+        while len(_browse_cache) > BROWSE_CACHE_SIZE:
+            _browse_cache.popitem(last=False)
+    return body
+
+
+def _scan_browse(relative_path):
+    """Scan a directory and return the serialized /api/browse response body (bytes)"""
     target_path = os.path.join(CNC_ROOT, relative_path)
     
-    if not os.path.exists(target_path):
-        return jsonify({'error': 'Path does not exist'}), 404
+    # (mtime, item) pairs - mtime is only needed for sorting, never sent to the frontend
+    entries_by_mtime = []
+    add_entry = entries_by_mtime.append
+    allowed = _ALLOWED_SUFFIXES
     
-    if not os.path.isdir(target_path):
-        return jsonify({'error': 'Not a directory'}), 400
+    # Same separator as os.path.join (the breadcrumb and search paths use os.sep), built once
+    prefix = os.path.join(relative_path, '') if relative_path else ''
     
-    items = []
-    
-    try:
-        with os.scandir(target_path) as entries:
-            for entry in entries:
-                relative_item_path = os.path.join(relative_path, entry.name) if relative_path else entry.name
-                
-                # Always add directories
-                if entry.is_dir(follow_symlinks=False):
-                    stat_info = entry.stat(follow_symlinks=False)
-                    items.append({
-                        'name': entry.name,
-                        'type': 'folder',
-                        'path': relative_item_path,
-                        'modified': stat_info.st_mtime
-                    })
-                # Only check files
-                elif entry.is_file(follow_symlinks=False):
-                    # Check if file has allowed extension
-                    file_ext = os.path.splitext(entry.name)[1].lower()
-                    if file_ext in ALLOWED_EXTENSIONS or file_ext == '':
-                        stat_info = entry.stat(follow_symlinks=False)
-                        items.append({
-                            'name': entry.name,
-                            'type': 'file',
-                            'path': relative_item_path,
-                            'modified': stat_info.st_mtime
-                        })
-        
-        # Sorteer items op modificatiedatum (nieuwste eerst)
-        items.sort(key=lambda x: x['modified'], reverse=True)
-        
-        # Verwijder de modified timestamp uit de response (niet nodig in frontend)
-        for item in items:
-            del item['modified']
+    with os.scandir(target_path) as entries:
+        for entry in entries:
+            name = entry.name
+            relative_item_path = f'{prefix}{name}'
             
-    except PermissionError:
-        return jsonify({'error': 'Permission denied'}), 403
-    except Exception as e:
-        return jsonify({'error': f'Error reading directory: {str(e)}'}), 500
+            # Always add directories - one is_dir() per entry (d_type, no syscall)
+            if entry.is_dir(follow_symlinks=False):
+                item_type = 'folder'
+            else:
+                # Check if file has allowed extension (leading dot is not an extension, like splitext);
+                # only then is_file() to drop symlinks and special files
+                dot = name.rfind('.')
+                file_ext = name[dot:].lower() if dot > 0 else ''
+                if file_ext not in allowed or not entry.is_file(follow_symlinks=False):
+                    continue
+                item_type = 'file'
+            
+            # One lstat per listed entry (cached on the DirEntry), skipped for filtered files
+            add_entry((entry.stat(follow_symlinks=False).st_mtime, {
+                'name': name,
+                'type': item_type,
+                'path': relative_item_path
+            }))
+    
+    # Sorteer items op modificatiedatum (nieuwste eerst)
+    entries_by_mtime.sort(key=itemgetter(0), reverse=True)
+    items = [item for _, item in entries_by_mtime]
     
     # Determine parent path
     parent_path = None
@@ -108,126 +214,160 @@ def browse_directory():
         if parent_path == '.':
             parent_path = ''
     
-    return jsonify({
+    return dump_json({
         'current_path': relative_path,
         'parent_path': parent_path,
         'items': items
     })
 
 
-def is_safe_path(base_path, user_path):
-    """Check if the user path is within the base path (security check)"""
-    base = Path(base_path).resolve()
-    target = (base / user_path).resolve()
-    return target.is_relative_to(base)
-
-
-def get_file_info(file_path):
-    """Get file metadata"""
-    stat = os.stat(file_path)
-    return {
-        'size': stat.st_size,
-        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
-    }
+@app.route('/api/browse')
+def browse_directory():
+    """Browse CNC directory structure"""
+    relative_path = request.args.get('path', '')
+    
+    # Security check
+    if not is_safe_path(relative_path):
+        return json_response({'error': 'Invalid path'}, 403)
+    
+    target_path = os.path.join(CNC_ROOT, relative_path)
+    
+    # One stat for existence, type and the cache key
+    try:
+        dir_stat = os.stat(target_path)
+    except OSError:
+        return json_response({'error': 'Path does not exist'}, 404)
+    
+    if not S_ISDIR(dir_stat.st_mode):
+        return json_response({'error': 'Not a directory'}, 400)
+    
+    try:
+        body = _browse_cached(relative_path, dir_stat.st_mtime_ns)
+    except PermissionError:
+        return json_response({'error': 'Permission denied'}, 403)
+    except Exception as e:
+        return json_response({'error': f'Error reading directory: {str(e)}'}, 500)
+    
+    return Response(body, mimetype='application/json')
 
 
 # Removed is_text_file function - now only using file extensions for filtering
 
 
-@app.route('/api/file')
-def get_file():
-    """Get file content"""
-    relative_path = request.args.get('path', '')
-    
+def resolve_file_path(relative_path):
+    """Validate a user supplied file path: (file_path, None) or (None, error response)"""
     # Security check
-    if not is_safe_path(CNC_ROOT, relative_path):
-        return jsonify({'error': 'Invalid path'}), 403
+    if not is_safe_path(relative_path):
+        return None, json_response({'error': 'Invalid path'}, 403)
     
     file_path = os.path.join(CNC_ROOT, relative_path)
     
     if not os.path.exists(file_path):
-        return jsonify({'error': 'File does not exist'}), 404
+        return None, json_response({'error': 'File does not exist'}, 404)
     
     if not os.path.isfile(file_path):
-        return jsonify({'error': 'Not a file'}), 400
+        return None, json_response({'error': 'Not a file'}, 400)
+    
+    return file_path, None
+
+
+@app.route('/api/file/meta')
+def get_file_meta():
+    """Get file metadata and K3 door parameters (content via /api/file/raw)"""
+    file_path, error = resolve_file_path(request.args.get('path', ''))
+    if error:
+        return error
     
     try:
-        # Try UTF-8 first
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            # Fallback to latin-1
-            with open(file_path, 'r', encoding='latin-1') as f:
-                content = f.read()
-        
-        file_info = get_file_info(file_path)
-        
-        result = {
-            'content': content,
-            'size': file_info['size'],
-            'modified': file_info['modified'],
-            'created': file_info['created']
-        }
+        result = get_file_info(file_path)
         
         # If this is a K1 file, try to find and parse the K3 parameter file
         if '_K1' in os.path.basename(file_path):
-            k3_path = file_path.replace('_K1', '_K3')
-            if os.path.exists(k3_path):
-                try:
-                    with open(k3_path, 'r', encoding='utf-8') as f:
-                        k3_content = f.read()
-                    result['parameters'] = parse_k3_parameters(k3_content)
-                except:
-                    pass
+            result['parameters'] = read_k3_parameters(file_path)
         
-        return jsonify(result)
+        return json_response(result)
     
     except PermissionError:
-        return jsonify({'error': 'Permission denied'}), 403
+        return json_response({'error': 'Permission denied'}, 403)
+    except Exception as e:
+        return json_response({'error': f'Error reading file: {str(e)}'}, 500)
+
+
+@app.route('/api/file/raw')
+def get_file_raw():
+    """Stream raw file content with ETag/Last-Modified (304 when unchanged)"""
+    file_path, error = resolve_file_path(request.args.get('path', ''))
+    if error:
+        return error
+    
+    try:
+        # Bytes are sent as-is; the frontend decodes (UTF-8 with latin-1 fallback).
+        # max_age=0 makes the browser revalidate with If-None-Match on every load.
+        return send_file(
+            file_path,
+            mimetype='text/plain',
+            conditional=True,
+            etag=True,
+            max_age=0
+        )
+    except PermissionError:
+        return json_response({'error': 'Permission denied'}, 403)
     except Exception as e:
-        return jsonify({'error': f'Error reading file: {str(e)}'}), 500
+        return json_response({'error': f'Error reading file: {str(e)}'}, 500)
+
+
+def read_k3_parameters(k1_path):
+    """Parse the K3 parameter file next to a K1 file, None if missing or unreadable"""
+    k3_path = k1_path.replace('_K1', '_K3')
+    try:
+        k3_stat = os.stat(k3_path)
+    except OSError:
+        return None
+    # Unchanged K3 files are not read or parsed again (stat replaces the exists() check)
+    params = _read_k3_parameters_cached(k3_path, k3_stat.st_mtime_ns, k3_stat.st_size)
+    # Callers get their own dict, the cached one must not be modified
+    return dict(params) if params else None
+
+
+@lru_cache(maxsize=256)
+def _read_k3_parameters_cached(k3_path, mtime_ns, size):
+    """Read and parse a K3 file; mtime_ns and size are only part of the cache key"""
+    try:
+        # RFID_APP lines are ASCII, stray non-UTF-8 bytes elsewhere must not hide them
+        with open(k3_path, 'rb') as f:
+            k3_content = f.read().decode('utf-8', 'replace')
+        return parse_k3_parameters(k3_content)
+    except:
+        return None
+
+
+# RFID_APP parameter name -> result key (LEFT/RIGHT are swapped on purpose for the viewer)
+_K3_KEYS = {
+    'RFID_APP_DOORLENGTH': 'length',
+    'RFID_APP_DOORWIDTH': 'width',
+    'RFID_APP_DOORTHICKNESS': 'thickness',
+    'RFID_APP_FOLD_ABOVE': 'fold_above',
+    'RFID_APP_FOLD_LEFT': 'fold_right',
+    'RFID_APP_FOLD_RIGHT': 'fold_left',
+}
+
+_K3_RE = re.compile(
+    r'^[ \t]*(RFID_APP_(?:DOORLENGTH|DOORWIDTH|DOORTHICKNESS|FOLD_ABOVE|FOLD_LEFT|FOLD_RIGHT))'
+    r'\[0\]=[ \t]*([-+\d.eE]+)',
+    re.M
+)
 
 
 def parse_k3_parameters(content):
     """Parse K3 parameter file for door dimensions"""
     params = {}
-    lines = content.split('\n')
     
-    for line in lines:
-        line = line.strip()
-        # Look for RFID_APP parameters
-        if 'RFID_APP_DOORLENGTH[0]=' in line:
-            try:
-                params['length'] = float(line.split('=')[1])
-            except:
-                pass
-        elif 'RFID_APP_DOORWIDTH[0]=' in line:
-            try:
-                params['width'] = float(line.split('=')[1])
-            except:
-                pass
-        elif 'RFID_APP_DOORTHICKNESS[0]=' in line:
-            try:
-                params['thickness'] = float(line.split('=')[1])
-            except:
-                pass
-        elif 'RFID_APP_FOLD_ABOVE[0]=' in line:
-            try:
-                params['fold_above'] = float(line.split('=')[1])
-            except:
-                pass
-        elif 'RFID_APP_FOLD_LEFT[0]=' in line:
-            try:
-                params['fold_right'] = float(line.split('=')[1])
-            except:
-                pass
-        elif 'RFID_APP_FOLD_RIGHT[0]=' in line:
-            try:
-                params['fold_left'] = float(line.split('=')[1])
-            except:
-                pass
+    # Look for RFID_APP parameters - one regex pass over the whole file
+    for match in _K3_RE.finditer(content):
+        try:
+            params[_K3_KEYS[match.group(1)]] = float(match.group(2))
+        except ValueError:
+            pass
     
     return params if params else None
 
@@ -235,58 +375,91 @@ def parse_k3_parameters(content):
 @app.route('/api/search')
 def search_files():
     """Search for files by name"""
-    query = request.args.get('q', '').lower()
+    query = request.args.get('q', '')
     
     if not query:
-        return jsonify({'results': []})
+        return json_response({'results': []})
+    
+    # Case-insensitive literal matcher, compiled once per request (no name.lower() per entry)
+    matches_query = re.compile(re.escape(query), re.IGNORECASE).search
     
     results = []
+    results_lock = threading.Lock()
     
     try:
-        # Use os.scandir recursively - more efficient than os.walk
-        def scan_directory(path, base_path):
-            if len(results) >= 50:
-                return
-                
-            try:
-                with os.scandir(path) as entries:
-                    for entry in entries:
-                        if len(results) >= 50:
-                            break
+        # Iterative os.scandir walk with an explicit stack - no recursion per directory.
+        # When top_level_dirs is given, subdirectories are collected there instead of walked.
+        def scan_directory(root_path, base_path, top_level_dirs=None):
+            # entry.path always starts with base_path, so slicing replaces os.path.relpath
+            base_len = len(base_path)
+            stack = [root_path]
+            subdirs = stack if top_level_dirs is None else top_level_dirs
+            # Fast locals for the per-entry loop (no global/attribute lookups per entry)
+            add_subdir = subdirs.append
+            scandir = os.scandir
+            sep = os.sep
+            allowed = _ALLOWED_SUFFIXES
+            skip_dirs = SEARCH_SKIP_DIRS
+            max_results = SEARCH_MAX_RESULTS
+            while stack and len(results) < max_results:
+                path = stack.pop()
+                try:
+                    with scandir(path) as entries:
+                        for entry in entries:
+                            if len(results) >= max_results:
+                                break
                             
-                        if entry.is_file(follow_symlinks=False):
-                            if query in entry.name.lower():
-                                file_ext = os.path.splitext(entry.name)[1].lower()
-                                if file_ext in ALLOWED_EXTENSIONS or file_ext == '':
-                                    relative_path = os.path.relpath(entry.path, base_path)
-                                    results.append({
-                                        'name': entry.name,
-                                        'path': relative_path,
-                                        'folder': os.path.dirname(relative_path)
-                                    })
-                        elif entry.is_dir(follow_symlinks=False):
-                            scan_directory(entry.path, base_path)
-            except PermissionError:
-                pass  # Skip directories we can't access
+                            # One is_dir() per entry; is_file() only for names that match the query
+                            name = entry.name
+                            if entry.is_dir(follow_symlinks=False):
+                                # Prune hidden and system directories before descending
+                                if name[0] != '.' and name not in skip_dirs:
+                                    add_subdir(entry.path)
+                            elif matches_query(name):
+                                # Same extension check as browse (leading dot is not an extension)
+                                dot = name.rfind('.')
+                                if ((name[dot:].lower() if dot > 0 else '') in allowed
+                                        and entry.is_file(follow_symlinks=False)):
+                                    relative_path = entry.path[base_len:].lstrip(sep)
+                                    # Limit is checked under the lock, other workers may be appending
+                                    with results_lock:
+                                        if len(results) >= max_results:
+                                            return
+                                        results.append({
+                                            'name': name,
+                                            'path': relative_path,
+                                            'folder': relative_path.rpartition(sep)[0]
+                                        })
+                except PermissionError:
+                    pass  # Skip directories we can't access
         
-        scan_directory(CNC_ROOT, CNC_ROOT)
+        # Scan the root itself, then walk each top-level folder on its own thread.
+        # scandir releases the GIL, so slow (network) drives are read concurrently.
+        top_level_dirs = []
+        scan_directory(CNC_ROOT, CNC_ROOT, top_level_dirs)
+        
+        if top_level_dirs and len(results) < SEARCH_MAX_RESULTS:
+            with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+                futures = [executor.submit(scan_directory, path, CNC_ROOT) for path in top_level_dirs]
+                for future in futures:
+                    future.result()
+        
+        return json_response({'results': results})
     
     except Exception as e:
-        return jsonify({'error': f'Search error: {str(e)}'}), 500
-    
-    return jsonify({'results': results})
+        return json_response({'error': f'Search error: {str(e)}'}, 500)
 
 
 @app.route('/')
 def index():
     """Serve the main HTML page"""
-    return send_from_directory('.', 'index.html')
+    return send_from_directory('.', 'index.html', conditional=True, max_age=STATIC_MAX_AGE)
 
 
 @app.route('/<path:filename>')
 def serve_static(filename):
-    """Serve static files (CSS, JS)"""
-    return send_from_directory('.', filename)
+    """Serve static files (CSS, JS) with ETag/Last-Modified (304 when unchanged)"""
+    return send_from_directory('.', filename, conditional=True, max_age=STATIC_MAX_AGE)
 
 
 @app.route('/api/check-ffmpeg')
@@ -297,6 +470,85 @@ def check_ffmpeg_endpoint():
     })
 
 
+def run_ffmpeg_piped(cmd, input_stream):
+    """Run an ffmpeg command that reads 'pipe:0', feeding it input_stream.
+
+    Raises subprocess.CalledProcessError (with decoded stderr) on failure.
+    """
+    # stderr goes to a temp file: a full stderr pipe would block ffmpeg while we write stdin
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_file)
+        # BrokenPipeError means ffmpeg stopped reading - the exit code below tells why
+        with suppress(BrokenPipeError), proc.stdin:
+            shutil.copyfileobj(input_stream, proc.stdin)
+        returncode = proc.wait()
+        
+        if returncode != 0:
+            stderr_file.seek(0)
+            raise subprocess.CalledProcessError(
+                returncode, cmd, stderr=stderr_file.read().decode('utf-8', 'replace')
+            )
+
+
+def stream_ffmpeg_piped(cmd, input_stream):
+    """Run an ffmpeg command that reads 'pipe:0' and writes 'pipe:1', yielding its output.
+
+    The first chunk is read before returning, so an ffmpeg run that fails without
+    producing output still raises subprocess.CalledProcessError in the caller.
+    input_stream is closed once ffmpeg has been fed.
+    """
+    # stderr goes to a temp file: a full stderr pipe would block ffmpeg
+    stderr_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr_file)
+    
+    # stdin is fed from a thread, stdout is read here - doing both on one thread can deadlock
+    def feed_stdin():
+        # BrokenPipeError means ffmpeg stopped reading - its exit code tells why
+        with suppress(BrokenPipeError), input_stream, proc.stdin:
+            shutil.copyfileobj(input_stream, proc.stdin)
+    
+    feeder = threading.Thread(target=feed_stdin, daemon=True)
+    feeder.start()
+    
+    def close(output_complete):
+        """Reap ffmpeg and return its stderr; killed only if the client went away mid-stream"""
+        if output_complete:
+            proc.wait()  # stdout EOF comes just before ffmpeg exits
+        elif proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        feeder.join()
+        proc.stdout.close()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode('utf-8', 'replace')
+        stderr_file.close()
+        return stderr
+    
+    first_chunk = proc.stdout.read(FFMPEG_CHUNK_SIZE)
+    if not first_chunk:
+        # No output at all: a failure still becomes a JSON error response
+        stderr = close(output_complete=True)
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+        return iter(())
+    
+    def generate():
+        output_complete = False
+        try:
+            chunk = first_chunk
+            while chunk:
+                yield chunk
+                chunk = proc.stdout.read(FFMPEG_CHUNK_SIZE)
+            output_complete = True
+        finally:
+            stderr = close(output_complete)
+            # The 200 status is already sent - the log is the only place a failure can show up
+            if output_complete and proc.returncode != 0:
+                print(f"FFmpeg error (exit {proc.returncode}), client got a truncated file: {stderr}")
+    
+    return generate()
+
+
 @app.route('/api/convert-video', methods=['POST'])
 def convert_video():
     """Convert WebM video to requested format using FFmpeg"""
@@ -317,38 +569,47 @@ def convert_video():
         
         video_file = request.files['video']
         
-        # Create temporary directory for processing
-        temp_dir = tempfile.mkdtemp()
-        input_path = os.path.join(temp_dir, f'input_{uuid.uuid4()}.webm')
-        
-        # Save uploaded file
-        video_file.save(input_path)
-        
         # Generate timestamp for output filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        # Determine output format and FFmpeg parameters
+        # Determine output format and FFmpeg parameters.
+        # MP4 and GIF are written to stdout and streamed; AVI needs a seekable file for its index.
         if target_format == 'mp4':
             output_filename = f'cnc-recording-{timestamp}.mp4'
-            output_path = os.path.join(temp_dir, output_filename)
-            # Convert to MP4 with H.264 codec
+            # Convert to MP4 with H.264 codec - fragmented, because +faststart cannot write to a pipe
+            if check_nvenc():
+                # NVIDIA GPU: CUDA decode, frames stay on the GPU for the NVENC encoder
+                video_args = [
+                    '-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda',
+                    '-i', 'pipe:0',
+                    '-c:v', 'h264_nvenc',
+                    '-preset', 'p4',
+                    '-rc', 'vbr',
+                    '-cq', '23'
+                ]
+            else:
+                video_args = [
+                    '-i', 'pipe:0',
+                    '-c:v', 'libx264',
+                    '-preset', 'medium',
+                    '-crf', '23'
+                ]
             cmd = [
-                'ffmpeg', '-i', input_path,
-                '-c:v', 'libx264',
-                '-preset', 'medium',
-                '-crf', '23',
+                'ffmpeg', *video_args,
                 '-c:a', 'aac',
                 '-b:a', '128k',
-                '-movflags', '+faststart',
-                '-y',
-                output_path
+                '-movflags', 'frag_keyframe+empty_moov+default_base_moof',
+                '-f', 'mp4',
+                'pipe:1'
             ]
         elif target_format == 'avi':
             output_filename = f'cnc-recording-{timestamp}.avi'
+            # Create temporary directory for the output; the upload is piped into ffmpeg's stdin
+            temp_dir = tempfile.mkdtemp()
             output_path = os.path.join(temp_dir, output_filename)
             # Convert to AVI with MJPEG codec
             cmd = [
-                'ffmpeg', '-i', input_path,
+                'ffmpeg', '-i', 'pipe:0',
                 '-c:v', 'mjpeg',
                 '-q:v', '3',
                 '-c:a', 'pcm_s16le',
@@ -357,30 +618,30 @@ def convert_video():
             ]
         elif target_format == 'gif':
             output_filename = f'cnc-recording-{timestamp}.gif'
-            output_path = os.path.join(temp_dir, output_filename)
-            # Convert to GIF with palette for better quality
-            palette_path = os.path.join(temp_dir, 'palette.png')
-            # First generate palette
-            cmd_palette = [
-                'ffmpeg', '-i', input_path,
-                '-vf', 'fps=15,scale=640:-1:flags=lanczos,palettegen',
-                '-y',
-                palette_path
-            ]
-            subprocess.run(cmd_palette, check=True, capture_output=True)
-            
-            # Then create GIF using palette
+            # Convert to GIF with palette for better quality - one ffmpeg run, one decode:
+            # split the scaled stream, build the palette from one branch, apply it to the other
             cmd = [
-                'ffmpeg', '-i', input_path, '-i', palette_path,
-                '-lavfi', 'fps=15,scale=640:-1:flags=lanczos[x];[x][1:v]paletteuse',
-                '-y',
-                output_path
+                'ffmpeg', '-i', 'pipe:0',
+                '-filter_complex',
+                '[0:v]fps=15,scale=640:-1:flags=lanczos,split[a][b];[a]palettegen[p];[b][p]paletteuse',
+                '-f', 'gif',
+                'pipe:1'
             ]
         else:
             return jsonify({'error': f'Unsupported format: {target_format}'}), 400
         
+        if target_format != 'avi':
+            # Run FFmpeg conversion and send its output while it is being produced.
+            # The upload stream is handed over to the stdin feeder: the request is closed (and with
+            # it every upload) when the view returns, before stream_with_context re-enters it.
+            input_stream, video_file.stream = video_file.stream, io.BytesIO()
+            chunks = stream_ffmpeg_piped(cmd, input_stream)
+            response = Response(stream_with_context(chunks), mimetype='application/octet-stream')
+            response.headers['Content-Disposition'] = f'attachment; filename={output_filename}'
+            return response
+        
         # Run FFmpeg conversion
-        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        run_ffmpeg_piped(cmd, video_file.stream)
         
         # Send converted file
         response = send_file(
@@ -395,14 +656,8 @@ def convert_video():
         @response.call_on_close
         def cleanup():
             try:
-                if os.path.exists(input_path):
-                    os.remove(input_path)
                 if os.path.exists(output_path):
                     os.remove(output_path)
-                if target_format == 'gif':
-                    palette_path_cleanup = os.path.join(temp_dir, 'palette.png')
-                    if os.path.exists(palette_path_cleanup):
-                        os.remove(palette_path_cleanup)
                 os.rmdir(temp_dir)
             except Exception as e:
                 print(f"Cleanup error: {e}")
@@ -431,6 +686,8 @@ if __name__ == '__main__':
     # Check FFmpeg availability
     if check_ffmpeg():
         print("✓ FFmpeg is beschikbaar - video conversie mogelijk")
+        if check_nvenc():
+            print("✓ NVIDIA NVENC gevonden - MP4 conversie op de GPU")
     else:
         print("⚠ FFmpeg niet gevonden - video conversie zal niet werken")
         print("  Installeer met: pip install ffmpeg-python")
@@ -441,4 +698,17 @@ if __name__ == '__main__':
     print(f"Server draait op: http://localhost:5000")
     print("Druk op CTRL+C om te stoppen\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # FLASK_DEV=1 -> Flask dev server with debugger/reloader (single process, not for production)
+    if os.environ.get('FLASK_DEV'):
+        app.run(host='0.0.0.0', port=5000, debug=True)
+    else:
+        # Multi-threaded WSGI server so a slow directory scan does not block other clients.
+        # On Linux run with gunicorn instead: gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:5000 server:app
+        try:
+            from waitress import serve
+        except ImportError:
+            print("⚠ waitress niet gevonden - Flask ontwikkelserver wordt gebruikt")
+            print("  Installeer met: pip install waitress")
+            app.run(host='0.0.0.0', port=5000, threaded=True)
+        else:
+            serve(app, host='0.0.0.0', port=5000, threads=8)